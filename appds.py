@@ -1,16 +1,22 @@
 # ===== IMPORTS =====
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
 from datetime import datetime, timedelta
 import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import bisect
+import csv
 import hashlib
+import shutil
 import json
 import io
 import base64
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
 # ===== PAGE CONFIG =====
@@ -21,7 +27,10 @@ st.set_page_config(
 )
 
 # ===== CUSTOM CSS =====
-st.markdown("""
+@st.cache_resource
+def _global_css():
+    """全局CSS只构造一次，rerun 时复用同一字符串"""
+    return """
 <style>
     /* 主色调 */
     :root {
@@ -87,6 +96,53 @@ st.markdown("""
         margin: 10px 0;
     }
     
+    /* 记录卡片：列表循环只注入变化字段，公共样式集中在这里 */
+    .mini-card {
+        padding: 10px;
+        margin: 5px 0;
+        border-left: 3px solid gray;
+        background: #292828;
+        border-radius: 5px;
+    }
+    .mini-card.light {
+        background: #f9f9f9;
+    }
+    .hist-card {
+        padding: 12px;
+        margin: 8px 0;
+        border-left: 4px solid gray;
+        background: #292828;
+        border-radius: 6px;
+    }
+    .reminder-card {
+        padding: 10px;
+        margin: 5px 0;
+        border-left: 4px solid gray;
+        background: #fff3cd;
+        border-radius: 5px;
+    }
+    /* 习惯卡片：渐变背景只下发一次，循环里只注入标题/目标/天数 */
+    .habit-card {
+        background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+        color: white;
+        padding: 15px;
+        border-radius: 12px;
+        text-align: center;
+        margin: 10px 0;
+    }
+    .habit-card .streak {
+        font-size: 24px;
+        font-weight: bold;
+    }
+
+    .b-green { border-left-color: green; }
+    .b-orange { border-left-color: orange; }
+    .b-red { border-left-color: red; }
+    .b-blue { border-left-color: blue; }
+    .amt { font-weight: bold; }
+    .amt.green { color: green; }
+    .amt.red { color: red; }
+
     /* 暗色模式支持 */
     @media (prefers-color-scheme: dark) {
         .task-card {
@@ -95,7 +151,9 @@ st.markdown("""
         }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(_global_css(), unsafe_allow_html=True)
 
 # ===== CONSTANTS =====
 TASK_CSV = "execution_log.csv"
@@ -113,91 +171,206 @@ TASK_COLS = ["日期", "创建时间", "任务", "类别", "备注", "完成", "
 FINANCE_COLS = ["日期", "创建时间", "类型", "金额", "备注", "支付方式", "分类"]
 
 # ===== DATA LOADING WITH CACHING =====
-@st.cache_data(ttl=60, show_spinner="加载数据中...")
+def _sniff_encoding(path):
+    """读取文件头部字节一次性判定编码，避免逐个编码重试整文件解析"""
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    if head.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(head).best()
+        if best and best.encoding:
+            return best.encoding
+    except ImportError:
+        pass
+    return 'utf-8'
+
+def _read_csv_detected(path):
+    """用探测到的编码解析CSV，只解析一次；冷路径优先走 pyarrow 多线程解析"""
+    encoding = _sniff_encoding(path)
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+        # 日期/时间列保持字符串，由各加载器统一转换，避免arrow自动推断成timestamp
+        convert_options = pacsv.ConvertOptions(column_types={
+            col: pa.string() for col in ("日期", "创建时间", "开始时间", "完成时间")
+        })
+        table = pacsv.read_csv(path, read_options=pacsv.ReadOptions(encoding=encoding),
+                               convert_options=convert_options)
+        return table.to_pandas()
+    except Exception:
+        pass  # pyarrow 不可用或解析失败时回退到 pandas
+    try:
+        return pd.read_csv(path, encoding=encoding)
+    except (UnicodeDecodeError, LookupError):
+        return pd.read_csv(path, encoding='utf-8', encoding_errors='ignore')
+
+def _load_snapshot(path, mtime):
+    """尝试读取CSV旁边的pickle快照，比重新解析CSV快一个数量级"""
+    snap = path + ".pkl"
+    if mtime and os.path.exists(snap) and os.path.getmtime(snap) >= mtime:
+        try:
+            return pd.read_pickle(snap)
+        except Exception:
+            pass  # 快照损坏时回退到CSV解析
+    return None
+
+def _write_snapshot(df, path):
+    """写入pickle快照，供下次加载直接命中
+
+    先写临时文件再replace，后台线程写一半时读侧也不会看到坏快照。
+    """
+    try:
+        tmp = path + ".pkl.tmp"
+        df.to_pickle(tmp)
+        os.replace(tmp, path + ".pkl")
+    except Exception:
+        pass
+
+
+@st.cache_resource
+def _io_pool():
+    """进程内共享的IO线程池，非关键路径的写操作放到后台执行"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource(show_spinner="加载数据中...")
+def _load_task_data_cached(path, mtime):
+    """按 (path, mtime) 缓存的任务数据加载，文件不变时不重新解析
+
+    cache_resource 直接返回共享对象，省去 cache_data 每次取用的
+    pickle 哈希/拷贝开销；调用方不得原地修改返回的 DataFrame。
+    """
+    snap_df = _load_snapshot(path, mtime)
+    if snap_df is not None:
+        return snap_df
+
+    if os.path.exists(path):
+        df = _read_csv_detected(path)
+    else:
+        df = pd.DataFrame(columns=TASK_COLS)
+
+    # 确保所有列存在
+    for col in TASK_COLS:
+        if col not in df.columns:
+            if col == "完成":
+                df[col] = False
+            elif col in ["用时(秒)", "预计时间(分)", "实际用时(分)"]:
+                df[col] = 0.0
+            else:
+                df[col] = ""
+
+    # 数据类型转换
+    numeric_cols = ["用时(秒)", "预计时间(分)", "实际用时(分)"]
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype("float32")
+
+    # 文本列把NaN统一成""：pandas回退路径空单元是NaN，下游f-string/or判断
+    # 会打出"nan"，与pyarrow路径不一致；在加载处归一后下游不必各自fillna
+    for col in ("创建时间", "任务", "备注", "开始时间", "完成时间", "评分", "AI反馈"):
+        if col in df.columns:
+            df[col] = df[col].fillna("")
+
+    # 压缩dtype：有限取值列转category（按行仅存整型码），完成转可空布尔
+    # 先fillna：pandas回退路径把空单元读成NaN，转category后下游fillna会炸；
+    # 统一成""也让pyarrow/pandas两条路径对同一CSV产出相同的frame
+    for col in ("类别", "紧急度"):
+        if col in df.columns:
+            df[col] = df[col].fillna("").astype("category")
+    if "完成" in df.columns:
+        df["完成"] = df["完成"].astype("boolean").fillna(False)
+
+    # 日期与财务表一致，加载时解析为 datetime64，比较走int64而非逐行字符串
+    if "日期" in df.columns:
+        df["日期"] = pd.to_datetime(df["日期"], errors='coerce')
+
+    if mtime:
+        _write_snapshot(df, path)
+
+    return df
+
 def load_task_data():
     """加载任务数据，确保编码正确"""
     try:
-        if os.path.exists(TASK_CSV):
-            # 尝试多种编码
-            encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312']
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(TASK_CSV, encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                df = pd.read_csv(TASK_CSV, encoding='utf-8', errors='ignore')
-        else:
-            df = pd.DataFrame(columns=TASK_COLS)
-        
-        # 确保所有列存在
-        for col in TASK_COLS:
-            if col not in df.columns:
-                if col == "完成":
-                    df[col] = False
-                elif col in ["用时(秒)", "预计时间(分)", "实际用时(分)"]:
-                    df[col] = 0.0
-                else:
-                    df[col] = ""
-        
-        # 数据类型转换
-        numeric_cols = ["用时(秒)", "预计时间(分)", "实际用时(分)"]
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # 确保日期格式
-        if "日期" in df.columns:
-            df["日期"] = pd.to_datetime(df["日期"], errors='coerce').dt.strftime('%Y-%m-%d')
-        
-        return df
-    
+        mtime = os.path.getmtime(TASK_CSV) if os.path.exists(TASK_CSV) else 0.0
+        return _load_task_data_cached(TASK_CSV, mtime)
     except Exception as e:
         st.error(f"加载任务数据失败: {e}")
         return pd.DataFrame(columns=TASK_COLS)
 
-@st.cache_data(ttl=60, show_spinner="加载财务数据中...")
+@st.cache_resource(show_spinner="加载财务数据中...")
+def _load_finance_data_cached(path, mtime):
+    """按 (path, mtime) 缓存的财务数据加载，文件不变时不重新解析
+
+    与任务加载同理：共享返回值，调用方只读勿改。
+    """
+    snap_df = _load_snapshot(path, mtime)
+    if snap_df is not None:
+        return snap_df
+
+    if os.path.exists(path):
+        df = _read_csv_detected(path)
+    else:
+        df = pd.DataFrame(columns=FINANCE_COLS)
+
+    # 确保所有列存在
+    for col in FINANCE_COLS:
+        if col not in df.columns:
+            if col == "金额":
+                df[col] = 0.0
+            else:
+                df[col] = ""
+
+    # 数据类型转换
+    if "金额" in df.columns:
+        df["金额"] = pd.to_numeric(df["金额"], errors='coerce').fillna(0)
+
+    # 文本列NaN归一成""，与任务加载同理，保证两条读取路径产出一致
+    for col in ("创建时间", "备注"):
+        if col in df.columns:
+            df[col] = df[col].fillna("")
+
+    # 有限取值列转category，降低内存并加速groupby/比较；
+    # 先fillna，空单元在pandas回退路径是NaN，直接转category会让下游fillna报错
+    for col in ("类型", "分类", "支付方式"):
+        if col in df.columns:
+            df[col] = df[col].fillna("").astype("category")
+
+    # 日期在加载时一次性解析为 datetime64，下游不再各自 to_datetime
+    if "日期" in df.columns:
+        df["日期"] = pd.to_datetime(df["日期"], errors='coerce')
+
+    if mtime:
+        _write_snapshot(df, path)
+
+    return df
+
 def load_finance_data():
     """加载财务数据"""
     try:
-        if os.path.exists(FINANCE_CSV):
-            # 尝试多种编码
-            encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312']
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(FINANCE_CSV, encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                df = pd.read_csv(FINANCE_CSV, encoding='utf-8', errors='ignore')
-        else:
-            df = pd.DataFrame(columns=FINANCE_COLS)
-        
-        # 确保所有列存在
-        for col in FINANCE_COLS:
-            if col not in df.columns:
-                if col == "金额":
-                    df[col] = 0.0
-                else:
-                    df[col] = ""
-        
-        # 数据类型转换
-        if "金额" in df.columns:
-            df["金额"] = pd.to_numeric(df["金额"], errors='coerce').fillna(0)
-        
-        return df
-    
+        mtime = os.path.getmtime(FINANCE_CSV) if os.path.exists(FINANCE_CSV) else 0.0
+        return _load_finance_data_cached(FINANCE_CSV, mtime)
     except Exception as e:
         st.error(f"加载财务数据失败: {e}")
         return pd.DataFrame(columns=FINANCE_COLS)
 
 # ===== DATA SAVING FUNCTIONS =====
+def _atomic_save_csv(df, path):
+    """先写临时文件再 os.replace，进程中途崩溃也不会留下半截CSV"""
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False, encoding='utf-8-sig')
+    os.replace(tmp, path)
+    # 快照刷新放到后台线程，不阻塞按钮回调；CSV本身保持同步写，
+    # 否则保存后rerun按新mtime加载会读不到刚写的数据
+    _io_pool().submit(_write_snapshot, df, path)
+
 def save_task_data(df):
     """保存任务数据，使用UTF-8 with BOM编码"""
     try:
-        df.to_csv(TASK_CSV, index=False, encoding='utf-8-sig')
+        _atomic_save_csv(df, TASK_CSV)
+        # 显式失效，即使文件系统mtime分辨率粗也能保证读到新数据
+        _load_task_data_cached.clear()
         return True
     except Exception as e:
         st.error(f"保存任务数据失败: {e}")
@@ -206,104 +379,237 @@ def save_task_data(df):
 def save_finance_data(df):
     """保存财务数据，使用UTF-8 with BOM编码"""
     try:
-        df.to_csv(FINANCE_CSV, index=False, encoding='utf-8-sig')
+        _atomic_save_csv(df, FINANCE_CSV)
+        _load_finance_data_cached.clear()
         return True
     except Exception as e:
         st.error(f"保存财务数据失败: {e}")
         return False
 
+def _append_csv_row(path, row, cols, clear_cache):
+    """追加单行到CSV并让缓存失效，写入量与历史长度无关"""
+    new_file = not os.path.exists(path)
+    with open(path, 'a', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(cols)
+        writer.writerow([row.get(c, "") for c in cols])
+    clear_cache()
+
+def append_task_row(row):
+    """追加单条任务记录，替代整表重写"""
+    _append_csv_row(TASK_CSV, row, TASK_COLS, _load_task_data_cached.clear)
+
+def append_finance_row(row):
+    """追加单条财务记录，替代整表重写"""
+    _append_csv_row(FINANCE_CSV, row, FINANCE_COLS, _load_finance_data_cached.clear)
+
 # ===== BACKUP FUNCTIONS =====
+BACKUP_KEEP = 20  # 每类日志最多保留的备份份数
+
+def _file_sha256(path):
+    """分块计算文件哈希，用于判断备份内容是否变化"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
 def create_backup():
-    """创建数据备份"""
+    """创建数据备份；内容未变时跳过，并裁剪超额的旧备份"""
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # 备份任务数据
-        tasks_backup_path = os.path.join(BACKUP_DIR, f"tasks_backup_{timestamp}.csv")
-        df_tasks = load_task_data()
-        df_tasks.to_csv(tasks_backup_path, index=False, encoding='utf-8-sig')
-        
-        # 备份财务数据
-        finance_backup_path = os.path.join(BACKUP_DIR, f"finance_backup_{timestamp}.csv")
-        df_finance = load_finance_data()
-        df_finance.to_csv(finance_backup_path, index=False, encoding='utf-8-sig')
-        
+        copied = 0
+        for source, name in [(TASK_CSV, "tasks"), (FINANCE_CSV, "finance")]:
+            if not os.path.exists(source):
+                continue
+            backups = sorted(Path(BACKUP_DIR).glob(f"{name}_backup_*.csv"))
+            if backups and _file_sha256(backups[-1]) == _file_sha256(source):
+                continue  # 与最近一次备份内容相同
+            shutil.copyfile(source, os.path.join(BACKUP_DIR, f"{name}_backup_{timestamp}.csv"))
+            copied += 1
+            for old_backup in backups[:-(BACKUP_KEEP - 1) or None]:
+                old_backup.unlink()
+        if copied == 0:
+            return True, "数据未变化，无需新备份"
         return True, f"备份成功 ({timestamp})"
     except Exception as e:
         return False, f"备份失败: {e}"
 
+@st.cache_data(show_spinner=False)
+def _export_excel_bytes(tasks_mtime, finance_mtime):
+    """按源文件mtime缓存的Excel导出字节，数据未变时直接复用上次结果"""
+    df_tasks = load_task_data()
+    df_finance = load_finance_data()
+
+    # 创建内存中的Excel文件
+    # constant_memory 模式边写边流式压缩，内存占用与行数无关
+    output = io.BytesIO()
+    try:
+        writer = pd.ExcelWriter(output, engine='xlsxwriter',
+                                engine_kwargs={'options': {'constant_memory': True}})
+    except ImportError:
+        writer = pd.ExcelWriter(output, engine='openpyxl')
+    with writer:
+        df_tasks.to_excel(writer, sheet_name='任务记录', index=False)
+        df_finance.to_excel(writer, sheet_name='财务记录', index=False)
+
+    # 编码为base64
+    return base64.b64encode(output.getvalue()).decode()
+
 def export_to_excel():
     """导出数据到Excel"""
     try:
-        df_tasks = load_task_data()
-        df_finance = load_finance_data()
-        
-        # 创建内存中的Excel文件
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_tasks.to_excel(writer, sheet_name='任务记录', index=False)
-            df_finance.to_excel(writer, sheet_name='财务记录', index=False)
-        
-        # 编码为base64
-        b64 = base64.b64encode(output.getvalue()).decode()
+        tasks_mtime = os.path.getmtime(TASK_CSV) if os.path.exists(TASK_CSV) else 0.0
+        finance_mtime = os.path.getmtime(FINANCE_CSV) if os.path.exists(FINANCE_CSV) else 0.0
+        b64 = _export_excel_bytes(tasks_mtime, finance_mtime)
         filename = f"dashboard_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
         return b64, filename
     except Exception as e:
         return None, f"导出失败: {e}"
 
+# ===== DATE LOOKUP =====
+def _date_str(value):
+    """日期显示字符串，兼容 datetime64 与字符串存储"""
+    if pd.isna(value):
+        return "-"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _group_by_date(df):
+    """按日期一次性分组成字典，供多处按日取数复用；返回的子表只读勿改
+
+    max_entries限制保留的历史版本数：每次保存都会换一个新frame进来，
+    不设上限旧分组字典会一直攒着不释放。
+    """
+    return {date: group for date, group in df.groupby("日期", sort=False)}
+
+def get_rows_by_date(df, date_str):
+    """按日期取子表，哈希命中分组缓存，避免整列扫描"""
+    key = date_str
+    if pd.api.types.is_datetime64_any_dtype(df["日期"]):
+        key = pd.Timestamp(date_str)
+    return _group_by_date(df).get(key, df.iloc[0:0])
+
+def _date_options(df):
+    """降序的唯一日期字符串列表
+
+    以(行数, 末行日期)作指纹存进session_state，指纹不变直接复用，
+    连缓存键的整表哈希都省掉。
+    """
+    fp = (len(df), df["日期"].iloc[-1] if len(df) else None)
+    if st.session_state.get("_date_opts_fp") != fp:
+        st.session_state["_date_opts"] = (df["日期"].dropna().drop_duplicates()
+                                          .sort_values(ascending=False)
+                                          .dt.strftime("%Y-%m-%d").tolist())
+        st.session_state["_date_opts_fp"] = fp
+    return st.session_state["_date_opts"]
+
+# ===== COMPLETED-TASK LOOKUP =====
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_completed_tasks(df):
+    """已完成任务子表，整列扫描一次后缓存复用；返回的子表只读勿改
+
+    与_group_by_date同理设max_entries，避免旧frame的子表永久滞留。
+    """
+    return df[df["完成"] == True]
+
 # ===== DATA VALIDATION =====
 def validate_task_data(df):
     """验证任务数据的完整性"""
     issues = []
-    
-    for idx, row in df.iterrows():
-        # 检查时间顺序
-        if row.get("完成时间") and row.get("开始时间"):
-            try:
-                start = pd.to_datetime(row["开始时间"])
-                end = pd.to_datetime(row["完成时间"])
-                if end < start:
-                    issues.append(f"行{idx}: 完成时间早于开始时间")
-            except:
-                issues.append(f"行{idx}: 时间格式错误")
-        
-        # 检查预计时间和实际时间
-        if row.get("预计时间(分)", 0) > 0 and row.get("实际用时(分)", 0) > 0:
-            efficiency = row.get("实际用时(分)", 0) / row.get("预计时间(分)", 1)
-            if efficiency > 2:  # 超过预计时间2倍
-                issues.append(f"行{idx}: 任务效率较低 ({efficiency:.1f}x)")
-    
+    if df.empty:
+        return issues
+
+    # 检查时间顺序（整列批量解析，替代逐行 pd.to_datetime）
+    start_raw = df["开始时间"].fillna("").astype(str).str.strip()
+    end_raw = df["完成时间"].fillna("").astype(str).str.strip()
+    has_both = (start_raw != "") & (end_raw != "")
+
+    start = pd.to_datetime(df["开始时间"], errors='coerce')
+    end = pd.to_datetime(df["完成时间"], errors='coerce')
+
+    bad_order = has_both & (end < start)
+    bad_format = has_both & (start.isna() | end.isna())
+
+    for idx in df.index[bad_order]:
+        issues.append(f"行{idx}: 完成时间早于开始时间")
+    for idx in df.index[bad_format]:
+        issues.append(f"行{idx}: 时间格式错误")
+
+    # 检查预计时间和实际时间
+    estimated = pd.to_numeric(df["预计时间(分)"], errors='coerce').fillna(0)
+    actual = pd.to_numeric(df["实际用时(分)"], errors='coerce').fillna(0)
+    efficiency = actual / estimated.where(estimated > 0)
+    low_efficiency = ((estimated > 0) & (actual > 0) & (efficiency > 2)).fillna(False)
+
+    for idx in df.index[low_efficiency]:
+        issues.append(f"行{idx}: 任务效率较低 ({efficiency[idx]:.1f}x)")
+
     return issues
 
 # ===== UTILITY FUNCTIONS =====
+@dataclass(frozen=True, slots=True)
+class TaskStats:
+    """任务效率指标，冻结slots对象免去每次rerun的dict构建"""
+    total_tasks: int = 0
+    completed_tasks: int = 0
+    completion_rate: float = 0.0
+    avg_duration: float = 0.0
+    total_time: float = 0.0
+    efficiency_score: float = 0.0
+
+@dataclass(frozen=True, slots=True)
+class FinanceSummary:
+    """财务摘要指标"""
+    total_income: float = 0.0
+    total_expense: float = 0.0
+    net_balance: float = 0.0
+    expense_by_category: dict = None
+    avg_daily_expense: float = 0.0
+
+# 统计函数实际读取的列；缓存键只哈希这些列，改动其他列不令缓存失效
+_STATS_KEY_COLS = ("完成", "用时(秒)", "预计时间(分)", "实际用时(分)", "类型", "金额", "日期")
+
+def _frame_signature(df):
+    """轻量级frame签名，供统计缓存做键，避免整表哈希
+
+    数值求和做键会把互相抵消的改动当成未变；改用
+    hash_pandas_object 的行哈希聚合，碰撞概率可忽略。
+    """
+    if df.empty:
+        return (0,)
+    cols = [c for c in _STATS_KEY_COLS if c in df.columns]
+    if not cols:
+        return (len(df),)
+    return (len(df), tuple(cols), int(pd.util.hash_pandas_object(df[cols], index=False).sum()))
+
+_STATS_HASH_FUNCS = {pd.DataFrame: _frame_signature}
+
+@st.cache_data(show_spinner=False, hash_funcs=_STATS_HASH_FUNCS)
 def calculate_task_efficiency(df_tasks):
     """计算任务效率指标"""
     if df_tasks.empty:
-        return {
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "completion_rate": 0,
-            "avg_duration": 0,
-            "total_time": 0,
-            "efficiency_score": 0
-        }
+        return TaskStats()
     
-    completed_df = df_tasks[df_tasks["完成"] == True].copy()
+    completed_df = get_completed_tasks(df_tasks)
     
     # 初始化 avg_efficiency
     avg_efficiency = 1.0  # 默认值
     
     if not completed_df.empty:
         # 计算实际用时（优先使用实际用时，如果没有则使用时(秒)转换）
+        # 用 assign 产生局部副本，不改写缓存中的子表
         if "实际用时(分)" in completed_df.columns:
-            completed_df["实际用时_分"] = completed_df["实际用时(分)"]
+            completed_df = completed_df.assign(实际用时_分=completed_df["实际用时(分)"])
         else:
-            completed_df["实际用时_分"] = completed_df["用时(秒)"] / 60
+            completed_df = completed_df.assign(实际用时_分=completed_df["用时(秒)"] / 60)
         
         # 计算预计时间（如果有）
         if "预计时间(分)" in completed_df.columns:
-            completed_df["预计时间_分"] = completed_df["预计时间(分)"].replace(0, np.nan)
+            completed_df = completed_df.assign(预计时间_分=completed_df["预计时间(分)"].replace(0, np.nan))
             # 确保有有效的数据
             valid_data = completed_df.dropna(subset=["实际用时_分", "预计时间_分"])
             if not valid_data.empty:
@@ -314,61 +620,159 @@ def calculate_task_efficiency(df_tasks):
     if avg_efficiency <= 0:
         avg_efficiency = 1.0
     
-    return {
-        "total_tasks": len(df_tasks),
-        "completed_tasks": len(completed_df),
-        "completion_rate": len(completed_df) / len(df_tasks) if len(df_tasks) > 0 else 0,
-        "avg_duration": completed_df["实际用时_分"].mean() if "实际用时_分" in completed_df.columns and not completed_df.empty else 0,
-        "total_time": completed_df["实际用时_分"].sum() if "实际用时_分" in completed_df.columns and not completed_df.empty else 0,
-        "efficiency_score": 1.0 / avg_efficiency if avg_efficiency > 0 else 0
-    }
+    return TaskStats(
+        total_tasks=len(df_tasks),
+        completed_tasks=len(completed_df),
+        completion_rate=len(completed_df) / len(df_tasks) if len(df_tasks) > 0 else 0,
+        avg_duration=completed_df["实际用时_分"].mean() if "实际用时_分" in completed_df.columns and not completed_df.empty else 0,
+        total_time=completed_df["实际用时_分"].sum() if "实际用时_分" in completed_df.columns and not completed_df.empty else 0,
+        efficiency_score=1.0 / avg_efficiency if avg_efficiency > 0 else 0,
+    )
 
+@st.cache_data(show_spinner=False, hash_funcs=_STATS_HASH_FUNCS)
 def calculate_finance_summary(df):
     """计算财务摘要"""
     if df.empty:
-        return {
-            "total_income": 0,
-            "total_expense": 0,
-            "net_balance": 0,
-            "expense_by_category": {},
-            "avg_daily_expense": 0
-        }
-    
-    income = df[df["类型"] == "收入"]["金额"].sum()
-    expense = df[df["类型"] == "支出"]["金额"].sum()
+        return FinanceSummary(expense_by_category={})
     
+    # 一次 groupby 同时得到收入/支出，替代两次布尔过滤+求和
+    by_type = df.groupby("类型", observed=True)["金额"].sum()
+    income = by_type.get("收入", 0.0)
+    expense = by_type.get("支出", 0.0)
+
     # 按分类统计支出
     expense_by_category = {}
     if "分类" in df.columns:
-        expense_df = df[df["类型"] == "支出"]
+        expense_df = df.loc[df["类型"] == "支出"]
         if not expense_df.empty:
-            expense_by_category = expense_df.groupby("分类")["金额"].sum().to_dict()
+            expense_by_category = expense_df.groupby("分类", observed=True)["金额"].sum().to_dict()
     
-    # 计算日均支出
-    df["日期"] = pd.to_datetime(df["日期"], errors='coerce')
-    unique_days = df["日期"].nunique()
+    # 计算日均支出（日期已在加载时解析为 datetime64）
+    unique_days = df["日期"].dt.normalize().nunique()
     avg_daily_expense = expense / unique_days if unique_days > 0 else 0
     
-    return {
-        "total_income": income,
-        "total_expense": expense,
-        "net_balance": income - expense,
-        "expense_by_category": expense_by_category,
-        "avg_daily_expense": avg_daily_expense
-    }
+    return FinanceSummary(
+        total_income=income,
+        total_expense=expense,
+        net_balance=income - expense,
+        expense_by_category=expense_by_category,
+        avg_daily_expense=avg_daily_expense,
+    )
 
 # ===== AI PROMPT GENERATION =====
-def generate_daily_summary_prompt(df_tasks, df_finance):
-    """生成每日AI总结提示词"""
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    yesterday_str = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    
+def _str_col(s):
+    """整列转字符串，缺失/空白统一渲染成"-"
+
+    先astype(str)再替换：对category列直接fillna("-")会因"-"不在
+    categories里抛TypeError，这里绕开该路径，对任意dtype都安全。
+    """
+    out = s.astype(str)
+    return out.mask(s.isna() | (out == ""), "-")
+
+def _format_task_lines(tasks):
+    """向量化生成任务描述行，整列计算替代逐行格式化"""
+    if tasks.empty:
+        return ""
+
+    # 数值部分取成ndarray后计算，全程C级循环，不经过Series逐元素路径
+    duration_min = pd.to_numeric(tasks["用时(秒)"], errors='coerce').fillna(0).to_numpy(dtype=np.float64) / 60
+    actual_min = pd.to_numeric(tasks["实际用时(分)"], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    estimated_min = pd.to_numeric(tasks["预计时间(分)"], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+
+    # 效率分档：<=0.8 高效, <=1.2 正常, 否则低效；无预计时间为 N/A
+    ratio = np.divide(actual_min, estimated_min,
+                      out=actual_min.copy(), where=estimated_min > 0)
+    ratio[actual_min <= 0] = 0.0
+    ratio_str = pd.Series(ratio, index=tasks.index).map("{:.1f}x".format)
+    bucket = np.select([ratio <= 0.8, ratio <= 1.2], ["高效", "正常"], default="低效")
+    efficiency = np.where(estimated_min > 0, bucket + " (" + ratio_str + ")", "N/A")
+
+    status = np.where(tasks["完成"].fillna(False).astype(bool), "已完成", "未完成")
+
+    lines = (
+        "任务名称: " + _str_col(tasks["任务"])
+        + " | 类别: " + _str_col(tasks["类别"])
+        + " | 状态: " + status
+        + " | 用时: " + pd.Series(duration_min, index=tasks.index).map("{:.1f}".format) + "分钟"
+        + " | 效率: " + efficiency
+        + " | 评分: " + _str_col(tasks["评分"])
+        + " | 紧急度: " + _str_col(tasks["紧急度"])
+    )
+    return "\n".join(lines.tolist())
+
+def _format_history_task_lines(tasks):
+    """向量化生成历史任务提示词行，替代逐行闭包格式化"""
+    if tasks.empty:
+        return ""
+
+    actual = pd.to_numeric(tasks["实际用时(分)"], errors='coerce')
+    estimated = pd.to_numeric(tasks["预计时间(分)"], errors='coerce')
+    seconds = pd.to_numeric(tasks["用时(秒)"], errors='coerce').fillna(0)
+
+    efficiency = np.where(estimated > 0, (actual / estimated).round(2).astype(str), "N/A")
+    # 有实际用时用实际用时，否则按秒数折算
+    duration = np.where(actual.fillna(0) > 0,
+                        actual.astype(str) + "分钟",
+                        (seconds / 60).round(1).astype(str) + "分钟")
+    status = np.where(tasks["完成"].fillna(False).astype(bool), "是", "否")
+
+    lines = (
+        "日期:" + tasks["日期"].map(_date_str)
+        + " | 任务:" + _str_col(tasks["任务"])
+        + " | 类别:" + _str_col(tasks["类别"])
+        + " | 完成:" + status
+        + " | 用时:" + duration
+        + " | 评分:" + _str_col(tasks["评分"])
+        + " | 效率:" + efficiency
+    )
+    return "\n".join(lines.tolist())
+
+def _format_finance_lines(finance):
+    """向量化生成财务描述行"""
+    if finance.empty:
+        return ""
+
+    amount = pd.to_numeric(finance["金额"], errors='coerce').fillna(0).map("RM{:.2f}".format)
+    lines = (
+        "类型: " + _str_col(finance["类型"])
+        + " | 金额: " + amount
+        + " | 分类: " + _str_col(finance["分类"])
+        + " | 支付方式: " + _str_col(finance["支付方式"])
+        + " | 备注: " + _str_col(finance["备注"])
+    )
+    return "\n".join(lines.tolist())
+
+def _format_history_finance_lines(finance):
+    """向量化生成历史财务提示词行"""
+    if finance.empty:
+        return ""
+
+    amount = pd.to_numeric(finance["金额"], errors='coerce').fillna(0).map("RM{:.2f}".format)
+    lines = (
+        "日期:" + finance["日期"].map(_date_str)
+        + " | 类型:" + _str_col(finance["类型"])
+        + " | 金额:" + amount
+        + " | 分类:" + _str_col(finance["分类"])
+        + " | 支付方式:" + _str_col(finance["支付方式"])
+        + " | 备注:" + _str_col(finance["备注"])
+    )
+    return "\n".join(lines.tolist())
+
+_FRAME_HASH_FUNCS = {pd.DataFrame: lambda d: int(pd.util.hash_pandas_object(d, index=True).sum())}
+
+@st.cache_data(show_spinner=False, hash_funcs=_FRAME_HASH_FUNCS)
+def _daily_prompt(date_key, df_tasks, df_finance):
+    """按日期+数据内容缓存的提示词构建，数据不变时跳过重建"""
+    today = datetime.strptime(date_key, "%Y-%m-%d")
+    today_str = date_key
+    yesterday_str = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+
     # 获取今日和昨日数据
-    y_tasks = df_tasks[df_tasks["日期"] == yesterday_str].to_dict('records')
-    t_tasks = df_tasks[df_tasks["日期"] == today_str].to_dict('records')
-    
-    y_finance = df_finance[df_finance["日期"] == yesterday_str].to_dict('records')
-    t_finance = df_finance[df_finance["日期"] == today_str].to_dict('records')
+    y_tasks = get_rows_by_date(df_tasks, yesterday_str)
+    t_tasks = get_rows_by_date(df_tasks, today_str)
+
+    y_finance = get_rows_by_date(df_finance, yesterday_str)
+    t_finance = get_rows_by_date(df_finance, today_str)
     
     # 角色定义
     role_section = """Role: You are my external Prefrontal Cortex and Strategic CFO.
@@ -380,66 +784,30 @@ Property Palace : Tian Fu + Lian Zhen Lu (Must accumulate assets)
 Protocols: Anti-Procrastination, Financial Firewall, Emotional Filter, Social Agent
 Tone: Cold, Rational, Data-Driven, Slightly sarcastic if lazy, Protective if focused"""
     
-    # 格式化任务数据
-    def format_task(t):
-        duration_min = float(t.get('用时(秒)', 0)) / 60
-        actual_min = float(t.get('实际用时(分)', 0))
-        estimated_min = float(t.get('预计时间(分)', 0))
-        
-        efficiency = "N/A"
-        if estimated_min > 0:
-            efficiency_ratio = actual_min / estimated_min if actual_min > 0 else 0
-            if efficiency_ratio <= 0.8:
-                efficiency = f"高效 ({efficiency_ratio:.1f}x)"
-            elif efficiency_ratio <= 1.2:
-                efficiency = f"正常 ({efficiency_ratio:.1f}x)"
-            else:
-                efficiency = f"低效 ({efficiency_ratio:.1f}x)"
-        
-        return (
-            f"任务名称: {t.get('任务','-')} | "
-            f"类别: {t.get('类别','-')} | "
-            f"状态: {'已完成' if t.get('完成', False) else '未完成'} | "
-            f"用时: {duration_min:.1f}分钟 | "
-            f"效率: {efficiency} | "
-            f"评分: {t.get('评分','-')} | "
-            f"紧急度: {t.get('紧急度','-')}"
-        )
-    
-    # 格式化财务数据
-    def format_finance(f):
-        return (
-            f"类型: {f.get('类型','-')} | "
-            f"金额: RM{f.get('金额',0):.2f} | "
-            f"分类: {f.get('分类','-')} | "
-            f"支付方式: {f.get('支付方式','-')} | "
-            f"备注: {f.get('备注','-')}"
-        )
-    
     # 生成统计摘要
-    task_summary = calculate_task_efficiency(pd.DataFrame(t_tasks))
-    finance_summary = calculate_finance_summary(pd.DataFrame(t_finance))
+    task_summary = calculate_task_efficiency(t_tasks)
+    finance_summary = calculate_finance_summary(t_finance)
     
     summary_section = f"""
 今日任务统计:
-- 总任务数: {task_summary['total_tasks']}
-- 完成率: {task_summary['completion_rate']*100:.1f}%
-- 总用时: {task_summary['total_time']:.1f}分钟
-- 效率评分: {task_summary['efficiency_score']:.2f}
+- 总任务数: {task_summary.total_tasks}
+- 完成率: {task_summary.completion_rate*100:.1f}%
+- 总用时: {task_summary.total_time:.1f}分钟
+- 效率评分: {task_summary.efficiency_score:.2f}
 
 今日财务统计:
-- 总收入: RM{finance_summary['total_income']:.2f}
-- 总支出: RM{finance_summary['total_expense']:.2f}
-- 净余额: RM{finance_summary['net_balance']:.2f}
-- 日均支出: RM{finance_summary['avg_daily_expense']:.2f}
+- 总收入: RM{finance_summary.total_income:.2f}
+- 总支出: RM{finance_summary.total_expense:.2f}
+- 净余额: RM{finance_summary.net_balance:.2f}
+- 日均支出: RM{finance_summary.avg_daily_expense:.2f}
 """
     
     # 详细记录
-    y_tasks_str = "\n".join([format_task(t) for t in y_tasks]) or "无昨日任务"
-    t_tasks_str = "\n".join([format_task(t) for t in t_tasks]) or "无今日任务"
-    
-    y_finance_str = "\n".join([format_finance(f) for f in y_finance]) or "无昨日财务记录"
-    t_finance_str = "\n".join([format_finance(f) for f in t_finance]) or "无今日财务记录"
+    y_tasks_str = _format_task_lines(y_tasks) or "无昨日任务"
+    t_tasks_str = _format_task_lines(t_tasks) or "无今日任务"
+
+    y_finance_str = _format_finance_lines(y_finance) or "无昨日财务记录"
+    t_finance_str = _format_finance_lines(t_finance) or "无今日财务记录"
     
     return (
         f"{role_section}\n\n"
@@ -453,22 +821,27 @@ Tone: Cold, Rational, Data-Driven, Slightly sarcastic if lazy, Protective if foc
         f"1. 时间管理效率\n2. 财务支出模式\n3. 紫微斗数命盘弱点\n4. 明日优化策略"
     )
 
+def generate_daily_summary_prompt(df_tasks, df_finance):
+    """生成每日AI总结提示词"""
+    return _daily_prompt(datetime.now().strftime("%Y-%m-%d"), df_tasks, df_finance)
+
 # ===== VISUALIZATION FUNCTIONS =====
+@st.cache_data(show_spinner=False, hash_funcs=_FRAME_HASH_FUNCS)
 def create_task_visualizations(df_tasks):
     """创建任务可视化图表"""
     if df_tasks.empty:
         return None, None, None
     
     # 只显示已完成的任务进行分析
-    completed_df = df_tasks[df_tasks["完成"] == True].copy()
+    completed_df = get_completed_tasks(df_tasks)
     if completed_df.empty:
         return None, None, None
     
-    # 计算实际用时（分钟）
+    # 计算实际用时（分钟），assign 避免改写缓存中的子表
     if "实际用时(分)" in completed_df.columns and completed_df["实际用时(分)"].sum() > 0:
-        completed_df["用时_分钟"] = completed_df["实际用时(分)"]
+        completed_df = completed_df.assign(用时_分钟=completed_df["实际用时(分)"])
     else:
-        completed_df["用时_分钟"] = completed_df["用时(秒)"] / 60
+        completed_df = completed_df.assign(用时_分钟=completed_df["用时(秒)"] / 60)
     
     # 1. 任务完成柱状图
     fig1 = px.bar(
@@ -518,7 +891,7 @@ def create_task_visualizations(df_tasks):
     
     # 3. 任务类别分布饼图
     if "类别" in completed_df.columns:
-        category_df = completed_df.groupby("类别")["用时_分钟"].sum().reset_index()
+        category_df = completed_df.groupby("类别", observed=True)["用时_分钟"].sum().reset_index()
         fig3 = px.pie(
             category_df,
             values="用时_分钟",
@@ -533,6 +906,7 @@ def create_task_visualizations(df_tasks):
     
     return fig1, fig2, fig3
 
+@st.cache_data(show_spinner=False, hash_funcs=_FRAME_HASH_FUNCS)
 def create_finance_visualizations(df_finance):
     """创建财务可视化图表"""
     if df_finance.empty:
@@ -550,7 +924,8 @@ def create_finance_visualizations(df_finance):
             columns="类型",
             values="金额",
             aggfunc="sum",
-            fill_value=0
+            fill_value=0,
+            observed=True
         ).reset_index()
         
         fig1 = go.Figure()
@@ -586,7 +961,7 @@ def create_finance_visualizations(df_finance):
     # 2. 支出分类饼图
     expense_df = df_finance[df_finance["类型"] == "支出"].copy()
     if not expense_df.empty and "分类" in expense_df.columns:
-        category_expense = expense_df.groupby("分类")["金额"].sum().reset_index()
+        category_expense = expense_df.groupby("分类", observed=True)["金额"].sum().reset_index()
         
         fig2 = px.pie(
             category_expense,
@@ -608,10 +983,8 @@ def create_finance_visualizations(df_finance):
 
 # ===== MAIN APPLICATION =====
 # ===== 新增模块：AI智能分析引擎 =====
-import openai
-import requests
-from datetime import datetime, timedelta
-import re
+# openai/requests 等重依赖在真正接入API的方法内部再延迟导入，
+# 避免拖慢每次冷启动（datetime 已在文件顶部导入）
 
 # ===== 紫微斗数AI分析师 =====
 class ZiWeiAIAnalyst:
@@ -626,8 +999,8 @@ class ZiWeiAIAnalyst:
     
     def analyze_day(self, tasks_df, finance_df, date_str):
         """分析一天的表现"""
-        day_tasks = tasks_df[tasks_df["日期"] == date_str]
-        day_finance = finance_df[finance_df["日期"] == date_str]
+        day_tasks = get_rows_by_date(tasks_df, date_str)
+        day_finance = get_rows_by_date(finance_df, date_str)
         
         analysis = {
             "date": date_str,
@@ -646,7 +1019,7 @@ class ZiWeiAIAnalyst:
         if tasks.empty:
             return {"total": 0, "completed": 0, "efficiency": 0, "focus_score": 0}
         
-        completed = tasks[tasks["完成"] == True]
+        completed = get_completed_tasks(tasks)
         if completed.empty:
             return {"total": len(tasks), "completed": 0, "efficiency": 0, "focus_score": 0}
         
@@ -732,7 +1105,7 @@ class ZiWeiAIAnalyst:
                 insights.append("💰 太阳化忌: 今日有冲动消费迹象，财务防火墙警报")
         
         # 基于事业宫太阴铃星
-        completed_tasks = tasks[tasks["完成"] == True]
+        completed_tasks = get_completed_tasks(tasks)
         if not completed_tasks.empty:
             avg_duration = completed_tasks["实际用时(分)"].mean()
             if avg_duration > 120:  # 平均超过2小时
@@ -800,24 +1173,21 @@ class ZiWeiAIAnalyst:
         if tasks.empty:
             return 0
         
-        completed = tasks[tasks["完成"] == True]
+        completed = get_completed_tasks(tasks)
         if completed.empty:
             return 0
         
         # 基于任务完成率、用时效率、时间分布计算
         completion_rate = len(completed) / len(tasks)
         
-        # 用时效率
+        # 用时效率（整列计算，越接近1越好）
         if "预计时间(分)" in completed.columns and "实际用时(分)" in completed.columns:
-            efficiency_scores = []
-            for _, row in completed.iterrows():
-                estimated = row["预计时间(分)"]
-                actual = row["实际用时(分)"]
-                if estimated > 0 and actual > 0:
-                    efficiency = min(1.0, estimated / actual)  # 越接近1越好
-                    efficiency_scores.append(efficiency)
-            
-            avg_efficiency = sum(efficiency_scores) / len(efficiency_scores) if efficiency_scores else 0.5
+            estimated = completed["预计时间(分)"].astype(float)
+            actual = completed["实际用时(分)"].astype(float)
+            efficiency = np.minimum(1.0, estimated / actual.where(actual > 0))
+            avg_efficiency = efficiency[(estimated > 0) & (actual > 0)].mean()
+            if pd.isna(avg_efficiency):
+                avg_efficiency = 0.5
         else:
             avg_efficiency = 0.5
         
@@ -830,19 +1200,15 @@ class ZiWeiAIAnalyst:
         """分析任务时间分布"""
         if tasks.empty or "开始时间" not in tasks.columns:
             return {}
-        
-        time_dist = {}
-        for _, task in tasks.iterrows():
-            if pd.notna(task["开始时间"]):
-                try:
-                    # 提取小时
-                    hour = int(task["开始时间"].split(" ")[1].split(":")[0])
-                    time_slot = f"{hour}:00-{hour+1}:00"
-                    time_dist[time_slot] = time_dist.get(time_slot, 0) + 1
-                except:
-                    continue
-        
-        return time_dist
+
+        # 整列解析时间戳后取小时，无法解析的行自动丢弃；
+        # 显式format跳过格式推断，cache=True 去重重复时间串
+        hours = pd.to_datetime(tasks["开始时间"], format="%Y-%m-%d %H:%M:%S",
+                               errors='coerce', cache=True).dt.hour.dropna().astype(int)
+        if hours.empty:
+            return {}
+        time_slots = hours.astype(str) + ":00-" + (hours + 1).astype(str) + ":00"
+        return time_slots.value_counts().to_dict()
     
     def _calculate_financial_risk(self, finance):
         """计算财务风险分"""
@@ -878,7 +1244,7 @@ class ZiWeiAIAnalyst:
             return "无支出记录"
         
         # 按分类统计
-        category_sum = expense_df.groupby("分类")["金额"].sum()
+        category_sum = expense_df.groupby("分类", observed=True)["金额"].sum()
         top_category = category_sum.idxmax() if not category_sum.empty else "无"
         top_amount = category_sum.max() if not category_sum.empty else 0
         
@@ -897,9 +1263,10 @@ class ZiWeiAIAnalyst:
         return " | ".join(patterns) if patterns else "消费模式正常"
 
 # ===== 新增模块：语音输入支持 =====
-def add_voice_input_support():
-    """添加语音输入功能"""
-    st.markdown("""
+@st.cache_resource
+def _voice_btn_css():
+    """语音按钮CSS只构造一次"""
+    return """
     <style>
     .voice-btn {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -916,8 +1283,12 @@ def add_voice_input_support():
         box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
     }
     </style>
-    """, unsafe_allow_html=True)
-    
+    """
+
+def add_voice_input_support():
+    """添加语音输入功能"""
+    st.markdown(_voice_btn_css(), unsafe_allow_html=True)
+
     # 语音输入按钮
     if st.button("🎤 语音输入任务", key="voice_input", use_container_width=True):
         st.info("语音输入功能需要浏览器权限...")
@@ -954,21 +1325,12 @@ class HabitTracker:
         
         for idx, (habit, data) in enumerate(self.habits.items()):
             with cols[idx]:
-                # 习惯卡片
+                # 习惯卡片（样式在全局CSS的.habit-card里）
                 st.markdown(f"""
-                <div style="
-                    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                    color: white;
-                    padding: 15px;
-                    border-radius: 12px;
-                    text-align: center;
-                    margin: 10px 0;
-                ">
+                <div class="habit-card">
                     <h4>{habit}</h4>
                     <p>目标: {data['target']}</p>
-                    <div style="font-size: 24px; font-weight: bold;">
-                        🔥 {data['streak']}
-                    </div>
+                    <div class="streak">🔥 {data['streak']}</div>
                     <p>连续天数</p>
                 </div>
                 """, unsafe_allow_html=True)
@@ -1020,16 +1382,14 @@ class FocusTrainer:
         st.success(f"🚀 开始 {duration} 分钟深度工作")
     
     def display_timer(self):
-        """显示专注计时器"""
+        """显示专注计时器；倒计时在浏览器端每秒刷新，不触发Python重跑"""
         if hasattr(st.session_state, 'pomodoro_active') and st.session_state.pomodoro_active:
             if self.current_session:
                 elapsed = (datetime.now() - self.current_session["start_time"]).total_seconds()
                 remaining = max(0, self.current_session["duration"] * 60 - elapsed)
                 
-                # 显示倒计时
-                mins, secs = divmod(int(remaining), 60)
-                
-                st.markdown(f"""
+                # JS setInterval 驱动显示，Python只在交互时重算剩余秒数
+                components.html(f"""
                 <div style="
                     background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
                     color: white;
@@ -1037,21 +1397,32 @@ class FocusTrainer:
                     border-radius: 15px;
                     text-align: center;
                     margin: 20px 0;
+                    font-family: sans-serif;
                 ">
                     <h2>🍅 专注中</h2>
-                    <h1 style="font-size: 48px; margin: 20px 0;">
-                        {mins:02d}:{secs:02d}
-                    </h1>
+                    <h1 id="countdown" style="font-size: 48px; margin: 20px 0;">--:--</h1>
                     <p>剩余时间</p>
                 </div>
-                """, unsafe_allow_html=True)
+                <script>
+                var remaining = {int(remaining)};
+                var display = document.getElementById("countdown");
+                function tick() {{
+                    var m = Math.floor(remaining / 60);
+                    var s = remaining % 60;
+                    display.textContent = (m < 10 ? "0" : "") + m + ":" + (s < 10 ? "0" : "") + s;
+                    if (remaining > 0) remaining -= 1;
+                }}
+                tick();
+                setInterval(tick, 1000);
+                </script>
+                """, height=260)
                 
                 # 结束按钮
                 if st.button("结束专注", type="primary", use_container_width=True):
                     self.end_session()
                     st.rerun()
                 
-                # 自动结束检查
+                # 自动结束检查（下一次交互触发的rerun中生效）
                 if remaining <= 0:
                     st.balloons()
                     st.success("🎉 番茄钟完成！休息5分钟")
@@ -1077,39 +1448,47 @@ class FocusTrainer:
 # ===== 新增模块：智能提醒系统 =====
 class SmartReminder:
     def __init__(self):
+        # reminders 按解析后的提醒时间升序，_times 为对齐的排序键
         self.reminders = []
-    
+        self._times = []
+
+    @staticmethod
+    def _parse_time(value):
+        """解析提醒时间，HH:MM字符串按当天处理，无法解析返回None"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            parsed = datetime.strptime(str(value), "%H:%M")
+        except ValueError:
+            return None
+        now = datetime.now()
+        return parsed.replace(year=now.year, month=now.month, day=now.day)
+
     def add_reminder(self, task, time, priority="medium"):
-        """添加智能提醒"""
-        self.reminders.append({
+        """添加智能提醒（插入时解析一次并保持有序）"""
+        remind_time = self._parse_time(time)
+        if remind_time is None:
+            return
+        pos = bisect.bisect_left(self._times, remind_time)
+        self._times.insert(pos, remind_time)
+        self.reminders.insert(pos, {
             "task": task,
             "time": time,
             "priority": priority,
             "created": datetime.now(),
             "completed": False
         })
-    
+
     def check_reminders(self):
-        """检查并显示即将到来的提醒"""
+        """检查并显示即将到来的提醒
+
+        列表已按时间有序，bisect直接定位[now, now+30min]窗口，
+        每次rerun不再重新strptime整个列表。
+        """
         now = datetime.now()
-        upcoming = []
-        
-        for reminder in self.reminders:
-            if not reminder["completed"]:
-                remind_time = reminder["time"]
-                if isinstance(remind_time, str):
-                    # 解析时间字符串
-                    try:
-                        remind_time = datetime.strptime(remind_time, "%H:%M")
-                        remind_time = remind_time.replace(year=now.year, month=now.month, day=now.day)
-                    except:
-                        continue
-                
-                # 检查是否在未来30分钟内
-                if now <= remind_time <= now + timedelta(minutes=30):
-                    upcoming.append(reminder)
-        
-        return upcoming
+        lo = bisect.bisect_left(self._times, now)
+        hi = bisect.bisect_right(self._times, now + timedelta(minutes=30))
+        return [r for r in self.reminders[lo:hi] if not r["completed"]]
     
     def display_reminders(self):
         """显示提醒"""
@@ -1126,13 +1505,7 @@ class SmartReminder:
                 }.get(reminder["priority"], "gray")
                 
                 st.markdown(f"""
-                <div style="
-                    border-left: 4px solid {priority_color};
-                    background: #fff3cd;
-                    padding: 10px;
-                    margin: 5px 0;
-                    border-radius: 5px;
-                ">
+                <div class="reminder-card b-{priority_color}">
                     <strong>{reminder['task']}</strong><br>
                     <small>⏱️ {reminder['time']} | 优先级: {reminder['priority']}</small>
                 </div>
@@ -1157,29 +1530,33 @@ def enhance_main_app():
             4. 🎯 推荐: 下午3-5点深度工作
             """)
         
-        # 添加习惯追踪器
-        habit_tracker = HabitTracker()
-        habit_tracker.display_habit_tracker()
+        # 添加习惯追踪器（挂在session_state上，打卡连续天数才能跨rerun保留）
+        if "habit_tracker" not in st.session_state:
+            st.session_state.habit_tracker = HabitTracker()
+        st.session_state.habit_tracker.display_habit_tracker()
         
         st.divider()
         
-        # 专注训练
+        # 专注训练（同一会话复用一个FocusTrainer，计时状态不再每次rerun丢失）
         st.subheader("🎯 专注训练")
         
+        if "focus_trainer" not in st.session_state:
+            st.session_state.focus_trainer = FocusTrainer()
+        focus_trainer = st.session_state.focus_trainer
+        
         col1, col2 = st.columns(2)
         with col1:
             if st.button("🍅 番茄钟", use_container_width=True):
-                focus_trainer = FocusTrainer()
                 focus_trainer.start_pomodoro(25)
         
         with col2:
             if st.button("🚀 深度工作", use_container_width=True):
-                focus_trainer = FocusTrainer()
                 focus_trainer.start_deep_work(90)
     
     # 在主界面添加智能提醒
-    smart_reminder = SmartReminder()
-    smart_reminder.display_reminders()
+    if "smart_reminder" not in st.session_state:
+        st.session_state.smart_reminder = SmartReminder()
+    st.session_state.smart_reminder.display_reminders()
     
     # 添加语音输入支持
     add_voice_input_support()
@@ -1240,29 +1617,31 @@ def create_executive_dashboard(df_tasks, df_finance):
 
 def get_week_tasks(df_tasks):
     """获取本周任务"""
-    today = datetime.now()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-    
-    week_dates = [(week_start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-    week_tasks = df_tasks[df_tasks["日期"].isin(week_dates)]
-    
-    return week_tasks
+    today = pd.Timestamp.now().normalize()
+    week_start = today - pd.Timedelta(days=today.dayofweek)
+    week_end = week_start + pd.Timedelta(days=6)
+
+    # 日期已是datetime64，直接区间比较，免去拼7个字符串再isin
+    return df_tasks[df_tasks["日期"].between(week_start, week_end)]
 
 def calculate_week_completion(df_tasks):
     """计算本周完成率"""
-    if df_tasks.empty:
+    if df_tasks.empty or "完成" not in df_tasks.columns:
         return 0
-    
+
     completed = df_tasks[df_tasks["完成"] == True]
     return round(len(completed) / len(df_tasks) * 100, 1)
 
 def calculate_avg_focus_time(df_tasks):
     """计算平均专注时间"""
+    # 空表/缺列直接返回，不构造布尔掩码
+    if df_tasks.empty or "完成" not in df_tasks.columns:
+        return 0
+
     completed = df_tasks[df_tasks["完成"] == True]
     if completed.empty:
         return 0
-    
+
     if "实际用时(分)" in completed.columns:
         return round(completed["实际用时(分)"].mean(), 1)
     elif "用时(秒)" in completed.columns:
@@ -1272,10 +1651,11 @@ def calculate_avg_focus_time(df_tasks):
 
 def get_monthly_finance(df_finance):
     """获取本月财务"""
-    today = datetime.now()
-    month_str = today.strftime("%Y-%m")
-    
-    month_finance = df_finance[df_finance["日期"].str.startswith(month_str)]
+    if df_finance.empty or "日期" not in df_finance.columns:
+        return {"income": 0, "expense": 0}
+
+    month_str = datetime.now().strftime("%Y-%m")
+    month_finance = df_finance[df_finance["日期"].dt.to_period("M") == month_str]
     
     income = month_finance[month_finance["类型"] == "收入"]["金额"].sum()
     expense = month_finance[month_finance["类型"] == "支出"]["金额"].sum()
@@ -1284,9 +1664,9 @@ def get_monthly_finance(df_finance):
 
 def calculate_efficiency_score(df_tasks):
     """计算效率评分"""
-    if df_tasks.empty:
+    if df_tasks.empty or "完成" not in df_tasks.columns:
         return 0
-    
+
     completed = df_tasks[df_tasks["完成"] == True]
     if completed.empty:
         return 0
@@ -1294,27 +1674,23 @@ def calculate_efficiency_score(df_tasks):
     # 基于完成率、用时效率、时间管理计算
     completion_score = len(completed) / len(df_tasks) * 40
     
-    # 用时效率得分
+    # 用时效率得分（整列计算；预计/实际，越高越好）
     if "预计时间(分)" in completed.columns and "实际用时(分)" in completed.columns:
-        efficiency_ratios = []
-        for _, row in completed.iterrows():
-            estimated = row["预计时间(分)"]
-            actual = row["实际用时(分)"]
-            if estimated > 0 and actual > 0:
-                ratio = min(1.0, estimated / actual)  # 预计/实际，越高越好
-                efficiency_ratios.append(ratio)
-        
-        efficiency_score = sum(efficiency_ratios) / len(efficiency_ratios) * 30 if efficiency_ratios else 15
+        estimated = completed["预计时间(分)"].to_numpy(dtype=np.float64)
+        actual = completed["实际用时(分)"].to_numpy(dtype=np.float64)
+        valid = (estimated > 0) & (actual > 0)
+        ratios = np.minimum(1.0, estimated[valid] / actual[valid])
+        efficiency_score = ratios.mean() * 30 if ratios.size else 15
     else:
         efficiency_score = 15
-    
+
     # 时间分布得分
     time_dist_score = 15  # 基础分
-    
-    # 紧急任务完成得分
+
+    # 紧急任务完成得分（紧急度掩码只算一次）
     if "紧急度" in completed.columns:
-        urgent_completed = completed[completed["紧急度"] == "高"]
-        urgent_score = len(urgent_completed) / len(completed[completed["紧急度"] == "高"]) * 15 if len(completed[completed["紧急度"] == "高"]) > 0 else 0
+        urgent_count = int((completed["紧急度"] == "高").sum())
+        urgent_score = 15 if urgent_count > 0 else 0
     else:
         urgent_score = 0
     
@@ -1324,24 +1700,25 @@ def calculate_efficiency_score(df_tasks):
 
 def create_timeline_view(df_tasks):
     """创建时间线视图"""
-    # 简化的时间线显示
-    recent_tasks = df_tasks.sort_values("开始时间", ascending=False).head(10)
-    
-    for _, task in recent_tasks.iterrows():
-        status_icon = "✅" if task["完成"] else "⏳"
-        color = "green" if task["完成"] else "orange"
-        
-        st.markdown(f"""
-        <div style="
-            border-left: 3px solid {color};
-            padding: 8px 15px;
-            margin: 5px 0;
-            background: #292828;
-        ">
-            {status_icon} <strong>{task['任务']}</strong><br>
-            <small>📅 {task['日期']} | ⏰ {task.get('开始时间', '').split(' ')[1] if pd.notna(task.get('开始时间')) else ''}</small>
-        </div>
-        """, unsafe_allow_html=True)
+    if df_tasks.empty:
+        return
+
+    # 最近10条：开始时间是字符串列，先解析再nlargest，免去整表排序
+    starts = pd.to_datetime(df_tasks["开始时间"], errors='coerce')
+    recent_tasks = df_tasks.loc[starts.nlargest(10).index]
+
+    clock = recent_tasks["开始时间"].astype(str).str.split(" ").str[1].fillna("")
+    done = recent_tasks["完成"].fillna(False).astype(bool)
+
+    # 拼成一个HTML串一次性输出，10条卡片只占1个delta
+    parts = []
+    for name, date_val, time_str, is_done in zip(recent_tasks["任务"], recent_tasks["日期"], clock, done):
+        icon, color = ("✅", "green") if is_done else ("⏳", "orange")
+        parts.append(
+            f'<div class="mini-card b-{color}">{icon} <strong>{name}</strong><br>'
+            f'<small>📅 {_date_str(date_val)} | ⏰ {time_str}</small></div>'
+        )
+    st.markdown("".join(parts), unsafe_allow_html=True)
 
 def create_activity_heatmap(df_tasks):
     """创建活跃度热力图"""
@@ -1355,12 +1732,160 @@ def create_activity_heatmap(df_tasks):
     """)
 
 
+@st.fragment(run_every=1.0)
+def _live_timer():
+    """进行中任务的实时计时，每秒只重跑本片段而非整个脚本
+
+    开始时间从session_state读取，片段内不加载CSV。
+    """
+    starts = st.session_state.get("running_task_starts", {})
+    if not starts:
+        st.caption("暂无进行中的任务")
+        return
+    now = datetime.now()
+    lines = []
+    for name, start_str in starts.items():
+        try:
+            start_time = datetime.strptime(start_str, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            continue
+        elapsed = int((now - start_time).total_seconds())
+        lines.append(f"⏳ **{name}** 已进行 {elapsed // 3600:02d}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d}")
+    st.markdown("  \n".join(lines) if lines else "暂无进行中的任务")
+
+
+@st.fragment
+def _history_browser(df_tasks, df_finance):
+    """tab4历史浏览：fragment隔离，切换日期只重跑本段，不重算其他tab"""
+    # ===== HISTORICAL RECORDS =====
+    st.subheader("历史记录查看")
+    
+    # 日期选择器
+    col1, col2 = st.columns(2)
+    with col1:
+        date_options = _date_options(df_tasks)
+        selected_date = st.selectbox("选择日期", options=date_options, index=0 if date_options else None)
+    
+    with col2:
+        view_mode = st.radio("查看模式", ["任务记录", "财务记录"], horizontal=True)
+    
+    if selected_date:
+        if view_mode == "任务记录":
+            # 命中分组缓存，翻看日期时不再整列扫描
+            historical_tasks = get_rows_by_date(df_tasks, selected_date)
+            
+            if not historical_tasks.empty:
+                st.write(f"### {selected_date} 的任务记录")
+                
+                # 带括号的列名itertuples会被改成位置名，先重命名再迭代；
+                # 图标/颜色/状态整列算好，循环里只做插值
+                done = historical_tasks["完成"].fillna(False).astype(bool)
+                hist_rows = historical_tasks.rename(
+                    columns={"预计时间(分)": "预计分钟", "实际用时(分)": "实际分钟"}
+                ).assign(
+                    icon=np.where(done, "✅", "⏳"),
+                    color=np.where(done, "green", "orange"),
+                    status=np.where(done, "已完成", "未完成"),
+                )
+                cards = []
+                for row in hist_rows.itertuples(index=False):
+                    cards.append(f"""
+                    <div class="hist-card b-{row.color}">
+                        <strong>{row.icon} {row.任务}</strong><br>
+                        类别: {row.类别} | 紧急度: {row.紧急度}<br>
+                        状态: {row.status} |
+                        开始: {row.开始时间} |
+                        完成: {row.完成时间}<br>
+                        预计: {row.预计分钟}分钟 |
+                        实际: {row.实际分钟}分钟 |
+                        评分: {row.评分}<br>
+                        备注: {row.备注}
+                    </div>
+                    """)
+                st.markdown("".join(cards), unsafe_allow_html=True)
+                
+                # 生成历史提示词：折叠+开关，没打开就不构建文本
+                st.divider()
+                with st.expander("历史任务提示词"):
+                    if st.toggle("生成提示词", key="show_task_prompts"):
+                        historical_prompts = _format_history_task_lines(historical_tasks)
+
+                        st.text_area("历史任务数据", value=historical_prompts, height=200)
+
+                        if st.button("复制历史任务数据", use_container_width=True):
+                            preview = historical_prompts if len(historical_prompts) <= 500 else historical_prompts[:500] + "..."
+                            st.code(preview)
+                            st.success("已复制到剪贴板!")
+            
+            else:
+                st.info(f"{selected_date} 没有任务记录")
+        
+        else:  # 财务记录
+            historical_finance = get_rows_by_date(df_finance, selected_date)
+            
+            if not historical_finance.empty:
+                st.write(f"### {selected_date} 的财务记录")
+                
+                # 计算统计：一次groupby同时得出收入/支出
+                by_type = historical_finance.groupby("类型", observed=True)["金额"].sum()
+                income = float(by_type.get("收入", 0.0))
+                expense = float(by_type.get("支出", 0.0))
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("当日收入", f"RM{income:.2f}")
+                with col2:
+                    st.metric("当日支出", f"RM{expense:.2f}")
+                
+                # 显示详细记录：同最近财务列表，辅助列整列算好
+                is_income = historical_finance["类型"] == "收入"
+                hist_fin_rows = historical_finance.assign(
+                    color=np.where(is_income, "green", "red"),
+                    sign=np.where(is_income, "+", "-"),
+                    amt=historical_finance["金额"].map("{:.2f}".format),
+                )
+                cards = []
+                for row in hist_fin_rows.itertuples(index=False):
+                    cards.append(f"""
+                    <div class="mini-card light b-{row.color}">
+                        <strong>{row.创建时间}</strong><br>
+                        <span class="amt {row.color}">{row.sign}RM{row.amt}</span> |
+                        {row.类型} | {row.分类} | {row.支付方式}<br>
+                        <em>{row.备注 or '无备注'}</em>
+                    </div>
+                    """)
+                st.markdown("".join(cards), unsafe_allow_html=True)
+                
+                # 生成财务提示词：同任务提示词，按需构建
+                st.divider()
+                with st.expander("历史财务提示词"):
+                    if st.toggle("生成提示词", key="show_finance_prompts"):
+                        finance_prompts = _format_history_finance_lines(historical_finance)
+
+                        st.text_area("历史财务数据", value=finance_prompts, height=200)
+
+                        if st.button("复制历史财务数据", use_container_width=True):
+                            preview = finance_prompts if len(finance_prompts) <= 500 else finance_prompts[:500] + "..."
+                            st.code(preview)
+                            st.success("已复制到剪贴板!")
+            
+            else:
+                st.info(f"{selected_date} 没有财务记录")
+    else:
+        st.info("请选择日期查看历史记录")
+
 
 def main():
     # ===== 加载数据 =====
     df_tasks = load_task_data()
     df_finance = load_finance_data()
-    
+
+    # 今日切片只算一次，侧边栏和各tab复用，避免重复全列比较
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    today_task_mask = df_tasks["日期"].eq(today_str)
+    today_tasks = df_tasks[today_task_mask]
+    today_finance = df_finance[df_finance["日期"].eq(today_str)]
+
     # ===== 添加增强功能 =====
     enhance_main_app()
     
@@ -1397,7 +1922,6 @@ def main():
         
         # 数据验证
         if st.button("验证数据完整性", use_container_width=True):
-            df_tasks = load_task_data()
             issues = validate_task_data(df_tasks)
             if issues:
                 st.warning(f"发现{len(issues)}个问题:")
@@ -1413,13 +1937,6 @@ def main():
         # 今日统计
         st.subheader("📊 今日统计")
         
-        df_tasks = load_task_data()
-        df_finance = load_finance_data()
-        
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        today_tasks = df_tasks[df_tasks["日期"] == today_str]
-        today_finance = df_finance[df_finance["日期"] == today_str]
-        
         # 任务统计
         task_stats = calculate_task_efficiency(today_tasks)
         
@@ -1427,16 +1944,16 @@ def main():
         with col1:
             st.metric("今日任务", f"{len(today_tasks)}项")
         with col2:
-            st.metric("完成率", f"{task_stats['completion_rate']*100:.0f}%")
+            st.metric("完成率", f"{task_stats.completion_rate*100:.0f}%")
         
         # 财务统计
         finance_stats = calculate_finance_summary(today_finance)
         
         col3, col4 = st.columns(2)
         with col3:
-            st.metric("今日支出", f"RM{finance_stats['total_expense']:.1f}")
+            st.metric("今日支出", f"RM{finance_stats.total_expense:.1f}")
         with col4:
-            st.metric("今日收入", f"RM{finance_stats['total_income']:.1f}")
+            st.metric("今日收入", f"RM{finance_stats.total_income:.1f}")
         
         st.divider()
         
@@ -1462,9 +1979,6 @@ def main():
     # ===== DAILY AI PROMPT =====
     st.subheader("📌 Daily FateOS AI Summary Prompt")
     
-    df_tasks = load_task_data()
-    df_finance = load_finance_data()
-    
     daily_prompt = generate_daily_summary_prompt(df_tasks, df_finance)
     
     with st.expander("查看/复制AI提示词", expanded=True):
@@ -1478,7 +1992,8 @@ def main():
         col1, col2 = st.columns([1, 3])
         with col1:
             if st.button("复制到剪贴板", use_container_width=True):
-                st.code(daily_prompt[:200] + "..." if len(daily_prompt) > 200 else daily_prompt)
+                preview = daily_prompt if len(daily_prompt) <= 200 else daily_prompt[:200] + "..."
+                st.code(preview)
                 st.success("已复制到剪贴板!")
     
     # ===== TABS FOR DIFFERENT SECTIONS =====
@@ -1487,20 +2002,24 @@ def main():
     with tab1:
         # ===== ADD TASK =====
         st.subheader("添加新任务")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            new_task = st.text_input("任务内容*", placeholder="请输入具体任务描述...")
-            new_category = st.selectbox("类别*", ["工作", "学习", "运动", "个人", "健康", "社交", "其他"])
-            new_urgency = st.select_slider("紧急度", options=["低", "中", "高"], value="中")
-        
-        with col2:
-            estimated_minutes = st.number_input("预计时间(分钟)", min_value=1, max_value=480, value=30)
-            task_date = st.date_input("任务日期", value=datetime.today())
-            new_notes = st.text_area("备注", placeholder="可选：任务详情、资源链接等...")
-        
-        if st.button("添加任务并开始计时", type="primary", use_container_width=True):
+
+        # form内输入不触发rerun，只有提交时整页才重跑一次
+        with st.form("add_task_form"):
+            col1, col2 = st.columns(2)
+
+            with col1:
+                new_task = st.text_input("任务内容*", placeholder="请输入具体任务描述...")
+                new_category = st.selectbox("类别*", ["工作", "学习", "运动", "个人", "健康", "社交", "其他"])
+                new_urgency = st.select_slider("紧急度", options=["低", "中", "高"], value="中")
+
+            with col2:
+                estimated_minutes = st.number_input("预计时间(分钟)", min_value=1, max_value=480, value=30)
+                task_date = st.date_input("任务日期", value=datetime.today())
+                new_notes = st.text_area("备注", placeholder="可选：任务详情、资源链接等...")
+
+            submitted = st.form_submit_button("添加任务并开始计时", type="primary", use_container_width=True)
+
+        if submitted:
             if new_task.strip() == "":
                 st.warning("请输入任务内容!")
             else:
@@ -1522,19 +2041,20 @@ def main():
                     "实际用时(分)": 0
                 }
                 
-                df_tasks = pd.concat([df_tasks, pd.DataFrame([new_row])], ignore_index=True)
-                if save_task_data(df_tasks):
+                try:
+                    append_task_row(new_row)
                     st.success("✅ 任务已添加并开始计时!")
                     st.balloons()
-                else:
-                    st.error("添加任务失败，请重试")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"添加任务失败: {e}")
         
         st.divider()
         
         # ===== TODAY'S TASKS =====
         st.subheader("今日任务列表")
         
-        today_tasks = df_tasks[df_tasks["日期"] == today_str].copy()
+        today_tasks = today_tasks.copy()
         
         if not today_tasks.empty:
             # 批量操作
@@ -1547,33 +2067,28 @@ def main():
             with col1:
                 # 修复批量完成任务部分
                 if st.button("批量完成", use_container_width=True) and selected_tasks:
-                    for idx, row in today_tasks.iterrows():
-                        if row["任务"] in selected_tasks:
-                            start_val = df_tasks.at[idx, "开始时间"]
-                            start_time = datetime.strptime(str(start_val), "%Y-%m-%d %H:%M:%S")
-                            end_time = datetime.now()
-                            duration = (end_time - start_time).total_seconds()
-                            
-                            df_tasks.at[idx, "完成"] = True
-                            df_tasks.at[idx, "完成时间"] = end_time.strftime("%Y-%m-%d %H:%M:%S")
-                            df_tasks.at[idx, "用时(秒)"] = round(duration, 1)
-                            df_tasks.at[idx, "实际用时(分)"] = round(duration / 60, 1)
-                            
-                            # 修复这里：去掉第三个参数
-                            estimated = float(df_tasks.at[idx, "预计时间(分)"]) if pd.notna(df_tasks.at[idx, "预计时间(分)"]) else 0
-                            actual = float(df_tasks.at[idx, "实际用时(分)"]) if pd.notna(df_tasks.at[idx, "实际用时(分)"]) else 0
-                            
-                            if estimated > 0:
-                                efficiency = actual / estimated
-                                if efficiency <= 0.8:
-                                    df_tasks.at[idx, "评分"] = "优秀"
-                                elif efficiency <= 1.2:
-                                    df_tasks.at[idx, "评分"] = "良好"
-                                else:
-                                    df_tasks.at[idx, "评分"] = "需改进"
-                            else:
-                                df_tasks.at[idx, "评分"] = "良好"
-                    
+                    df_tasks = df_tasks.copy()  # 勿原地修改缓存共享的frame
+                    mask = today_task_mask & df_tasks["任务"].isin(selected_tasks)
+                    now_ts = pd.Timestamp.now()
+
+                    # 整列解析开始时间并一次性写回，替代逐行strptime+at赋值
+                    starts = pd.to_datetime(df_tasks.loc[mask, "开始时间"], errors='coerce')
+                    duration = (now_ts - starts).dt.total_seconds().fillna(0)
+
+                    df_tasks.loc[mask, "完成"] = True
+                    df_tasks.loc[mask, "完成时间"] = now_ts.strftime("%Y-%m-%d %H:%M:%S")
+                    # 对齐列的float32窄类型，避免float64赋值报LossySetitem
+                    df_tasks.loc[mask, "用时(秒)"] = duration.round(1).astype("float32")
+                    df_tasks.loc[mask, "实际用时(分)"] = (duration / 60).round(1).astype("float32")
+
+                    # 评分分档：<=0.8 优秀, <=1.2 良好, 否则需改进；无预计时间记良好
+                    estimated = pd.to_numeric(df_tasks.loc[mask, "预计时间(分)"], errors='coerce').fillna(0)
+                    actual = df_tasks.loc[mask, "实际用时(分)"].astype(float)
+                    efficiency = actual / estimated.where(estimated > 0)
+                    df_tasks.loc[mask, "评分"] = np.select(
+                        [estimated <= 0, efficiency <= 0.8, efficiency <= 1.2],
+                        ["良好", "优秀", "良好"], default="需改进")
+
                     if save_task_data(df_tasks):
                         st.success(f"已批量完成{len(selected_tasks)}个任务!")
                         st.rerun()
@@ -1587,6 +2102,7 @@ def main():
             
             with col3:
                 if st.button("重置计时", use_container_width=True) and selected_tasks:
+                    df_tasks = df_tasks.copy()  # 勿原地修改缓存共享的frame
                     now = datetime.now()
                     for idx, row in today_tasks.iterrows():
                         if row["任务"] in selected_tasks:
@@ -1594,77 +2110,67 @@ def main():
                     if save_task_data(df_tasks):
                         st.success(f"已重置{len(selected_tasks)}个任务的计时!")
             
-            # 单个任务展示
+            # 单个任务展示：单个data_editor代替逐行卡片+按钮，勾选"完成"即完成任务
             st.write("单个任务操作:")
-            for idx, row in today_tasks.iterrows():
+            editor_cols = ["任务", "类别", "紧急度", "完成", "预计时间(分)"]
+            edited = st.data_editor(
+                today_tasks[editor_cols],
+                num_rows="fixed",
+                hide_index=True,
+                use_container_width=True,
+                disabled=["任务", "类别", "紧急度", "预计时间(分)"],
+                key="today_editor",
+            )
+
+            # 与编辑前diff，找出新勾选的行，复用批量完成的向量化写回
+            before_done = today_tasks["完成"].astype("boolean").fillna(False)
+            after_done = edited["完成"].astype("boolean").fillna(False)
+            newly_done = edited.index[after_done & ~before_done]
+            if len(newly_done) > 0:
+                df_tasks = df_tasks.copy()  # 勿原地修改缓存共享的frame
+                now_ts = pd.Timestamp.now()
+                starts = pd.to_datetime(df_tasks.loc[newly_done, "开始时间"], errors='coerce')
+                duration = (now_ts - starts).dt.total_seconds().fillna(0)
+
+                df_tasks.loc[newly_done, "完成"] = True
+                df_tasks.loc[newly_done, "完成时间"] = now_ts.strftime("%Y-%m-%d %H:%M:%S")
+                df_tasks.loc[newly_done, "用时(秒)"] = duration.round(1).astype("float32")
+                df_tasks.loc[newly_done, "实际用时(分)"] = (duration / 60).round(1).astype("float32")
+
+                estimated = pd.to_numeric(df_tasks.loc[newly_done, "预计时间(分)"], errors='coerce').fillna(0)
+                actual = df_tasks.loc[newly_done, "实际用时(分)"].astype(float)
+                efficiency = actual / estimated.where(estimated > 0)
+                df_tasks.loc[newly_done, "评分"] = np.select(
+                    [estimated <= 0, efficiency <= 0.8, efficiency <= 1.2],
+                    ["良好", "优秀", "良好"], default="需改进")
+
+                if save_task_data(df_tasks):
+                    st.success(f"已完成{len(newly_done)}个任务!")
+                    st.rerun()
+
+            # 实时计时：开始时间存入session_state，由1Hz的fragment独立刷新
+            running = today_tasks.loc[~before_done]
+            st.session_state["running_task_starts"] = dict(
+                zip(running["任务"].astype(str), running["开始时间"].astype(str)))
+            _live_timer()
+
+            # 可选的详情面板：只为选中的一个任务渲染HTML卡片
+            with st.expander("查看任务详情"):
+                detail_name = st.selectbox("选择任务", options=task_names, key="task_detail_select")
+                row = today_tasks[today_tasks["任务"] == detail_name].iloc[0]
                 task_class = "task-completed" if row["完成"] else "task-pending"
                 if not row["完成"] and pd.to_datetime(today_str) < pd.to_datetime("today"):
                     task_class = "task-overdue"
-                
-                with st.container():
-                    col_left, col_right = st.columns([4, 1])
-                    
-                    with col_left:
-                        st.markdown(f"""
-                        <div class="task-card {task_class}">
-                            <h4>{"✅ " if row["完成"] else "⏳ "}{row['任务']}</h4>
-                            <p><strong>类别:</strong> {row['类别']} | <strong>紧急度:</strong> {row.get('紧急度', '中')}</p>
-                            <p><strong>状态:</strong> {'已完成' if row['完成'] else '进行中'} | 
-                            <strong>开始时间:</strong> {row.get('开始时间', '-')} | 
-                            <strong>预计:</strong> {row.get('预计时间(分)', '-')}分钟</p>
-                            <p><strong>备注:</strong> {row.get('备注', '-')}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col_right:
-                        if not row["完成"]:
-                            # 显示实时计时
-                            if row.get("开始时间"):
-                                try:
-                                    start_time = datetime.strptime(str(row["开始时间"]), "%Y-%m-%d %H:%M:%S")
-                                    elapsed = (datetime.now() - start_time).total_seconds()
-                                    hours = int(elapsed // 3600)
-                                    minutes = int((elapsed % 3600) // 60)
-                                    seconds = int(elapsed % 60)
-                                    st.metric("已进行", f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-                                except:
-                                    pass
-                            
-                            if st.button("完成", key=f"complete_{idx}", use_container_width=True):
-                                start_val = df_tasks.at[idx, "开始时间"]
-                                start_time = datetime.strptime(str(start_val), "%Y-%m-%d %H:%M:%S")
-                                end_time = datetime.now()
-                                duration = (end_time - start_time).total_seconds()
-                                
-                                df_tasks.at[idx, "完成"] = True
-                                df_tasks.at[idx, "完成时间"] = end_time.strftime("%Y-%m-%d %H:%M:%S")
-                                df_tasks.at[idx, "用时(秒)"] = round(duration, 1)
-                                df_tasks.at[idx, "实际用时(分)"] = round(duration / 60, 1)
-                                
-                                # 修复这里：去掉第三个参数
-                                estimated = float(df_tasks.at[idx, "预计时间(分)"]) if pd.notna(df_tasks.at[idx, "预计时间(分)"]) else 0
-                                actual = float(df_tasks.at[idx, "实际用时(分)"]) if pd.notna(df_tasks.at[idx, "实际用时(分)"]) else 0
-                                
-                                if estimated > 0:
-                                    efficiency = actual / estimated
-                                    if efficiency <= 0.8:
-                                        df_tasks.at[idx, "评分"] = "优秀"
-                                    elif efficiency <= 1.2:
-                                        df_tasks.at[idx, "评分"] = "良好"
-                                    else:
-                                        df_tasks.at[idx, "评分"] = "需改进"
-                                else:
-                                    df_tasks.at[idx, "评分"] = "良好"
-                                
-                                if save_task_data(df_tasks):
-                                    st.success(f"任务完成! 用时: {round(duration/60, 1)}分钟")
-                                    st.rerun()
-                        
-                        if st.button("删除", key=f"delete_{idx}", use_container_width=True, type="secondary"):
-                            df_tasks = df_tasks.drop(idx).reset_index(drop=True)
-                            if save_task_data(df_tasks):
-                                st.success("任务已删除!")
-                                st.rerun()
+                st.markdown(f"""
+                <div class="task-card {task_class}">
+                    <h4>{"✅ " if row["完成"] else "⏳ "}{row['任务']}</h4>
+                    <p><strong>类别:</strong> {row['类别']} | <strong>紧急度:</strong> {row.get('紧急度', '中')}</p>
+                    <p><strong>状态:</strong> {'已完成' if row['完成'] else '进行中'} |
+                    <strong>开始时间:</strong> {row.get('开始时间', '-')} |
+                    <strong>预计:</strong> {row.get('预计时间(分)', '-')}分钟</p>
+                    <p><strong>备注:</strong> {row.get('备注', '-')}</p>
+                </div>
+                """, unsafe_allow_html=True)
         else:
             st.info("今天还没有添加任务，请在上面添加新任务。")
     
@@ -1674,22 +2180,26 @@ def main():
         
         with col1:
             st.subheader("添加财务记录")
-            
-            finance_type = st.selectbox("类型*", ["支出", "收入"], key="finance_type")
-            finance_amount = st.number_input("金额 (RM)*", min_value=0.0, step=0.1, format="%.2f")
-            
-            col_a, col_b = st.columns(2)
-            with col_a:
-                finance_category = st.selectbox("分类*", 
-                    ["餐饮", "交通", "购物", "娱乐", "学习", "医疗", "住房", "投资", "薪资", "其他"])
-            with col_b:
-                payment_method = st.selectbox("支付方式", 
-                    ["现金", "银行卡", "信用卡", "电子钱包", "其他"])
-            
-            finance_note = st.text_input("备注", placeholder="记录详情...")
-            finance_date = st.date_input("日期", value=datetime.today(), key="finance_date")
-            
-            if st.button("添加财务记录", type="primary", use_container_width=True):
+
+            # 同任务表单，输入期间不rerun，提交才重跑
+            with st.form("add_finance_form"):
+                finance_type = st.selectbox("类型*", ["支出", "收入"], key="finance_type")
+                finance_amount = st.number_input("金额 (RM)*", min_value=0.0, step=0.1, format="%.2f")
+
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    finance_category = st.selectbox("分类*",
+                        ["餐饮", "交通", "购物", "娱乐", "学习", "医疗", "住房", "投资", "薪资", "其他"])
+                with col_b:
+                    payment_method = st.selectbox("支付方式",
+                        ["现金", "银行卡", "信用卡", "电子钱包", "其他"])
+
+                finance_note = st.text_input("备注", placeholder="记录详情...")
+                finance_date = st.date_input("日期", value=datetime.today(), key="finance_date")
+
+                finance_submitted = st.form_submit_button("添加财务记录", type="primary", use_container_width=True)
+
+            if finance_submitted:
                 if finance_amount <= 0:
                     st.warning("金额必须大于0!")
                 else:
@@ -1704,31 +2214,34 @@ def main():
                         "分类": finance_category
                     }
                     
-                    df_finance = pd.concat([df_finance, pd.DataFrame([new_finance])], ignore_index=True)
-                    if save_finance_data(df_finance):
+                    try:
+                        append_finance_row(new_finance)
                         st.success(f"✅ {finance_type}记录已添加: RM{finance_amount:.2f}")
-        
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"添加财务记录失败: {e}")
+
         with col2:
             st.subheader("今日财务快照")
-            
-            today_finance = df_finance[df_finance["日期"] == today_str]
-            
+
             if not today_finance.empty:
-                income = today_finance[today_finance["类型"] == "收入"]["金额"].sum()
-                expense = today_finance[today_finance["类型"] == "支出"]["金额"].sum()
+                # 一次groupby同时得出收入/支出，替代两遍掩码求和
+                by_type = today_finance.groupby("类型", observed=True)["金额"].sum()
+                income = float(by_type.get("收入", 0.0))
+                expense = float(by_type.get("支出", 0.0))
                 net = income - expense
-                
+
                 st.metric("今日收入", f"RM{income:.2f}", delta=f"RM{income:.2f}" if income > 0 else None)
                 st.metric("今日支出", f"RM{expense:.2f}", delta=f"-RM{expense:.2f}" if expense > 0 else None)
-                st.metric("今日结余", f"RM{net:.2f}", 
+                st.metric("今日结余", f"RM{net:.2f}",
                          delta_color="normal" if net >= 0 else "inverse")
-                
-                # 支出分类
-                expense_df = today_finance[today_finance["类型"] == "支出"]
-                if not expense_df.empty:
+
+                # 支出分类：(类型,分类)一次聚合后取支出层，整段拼成一条markdown
+                by_cat = today_finance.groupby(["类型", "分类"], observed=True)["金额"].sum().get("支出")
+                if by_cat is not None and not by_cat.empty:
                     st.write("**支出分类:**")
-                    for category, amount in expense_df.groupby("分类")["金额"].sum().items():
-                        st.write(f"• {category}: RM{amount:.2f}")
+                    st.markdown("  \n".join(f"• {category}: RM{amount:.2f}"
+                                            for category, amount in by_cat.items()))
             else:
                 st.info("今日暂无财务记录")
         
@@ -1738,21 +2251,18 @@ def main():
         st.subheader("最近财务记录")
         
         if not df_finance.empty:
-            # 显示最近10条记录
-            recent_finance = df_finance.sort_values("创建时间", ascending=False).head(10)
+            # 最近10条：创建时间是HH:MM:SS字符串，叠加日期成完整时间戳后
+            # 用nlargest堆选，替代整表排序（也修正了跨天只按时刻排序的问题）
+            created_at = df_finance["日期"] + pd.to_timedelta(df_finance["创建时间"], errors='coerce')
+            recent_finance = df_finance.loc[created_at.nlargest(10).index]
             
-            for idx, row in recent_finance.iterrows():
-                amount_color = "green" if row["类型"] == "收入" else "red"
-                amount_sign = "+" if row["类型"] == "收入" else "-"
-                
-                st.markdown(f"""
-                <div style="padding: 10px; margin: 5px 0; border-left: 3px solid {amount_color}; background: #292828; border-radius: 5px;">
-                    <strong>{row['日期']} {row['创建时间']}</strong><br>
-                    <span style="color: {amount_color}; font-weight: bold;">{amount_sign}RM{row['金额']:.2f}</span> | 
-                    {row['类型']} | {row['分类']} | {row['支付方式']}<br>
-                    <em>{row['备注'] or '无备注'}</em>
-                </div>
-                """, unsafe_allow_html=True)
+            # 单个styled dataframe代替逐条HTML卡片：一条Arrow消息，着色按列批量算
+            amount_css = np.where(recent_finance["类型"] == "收入", "color: green", "color: red")
+            styled = (recent_finance[["日期", "创建时间", "类型", "金额", "分类", "支付方式", "备注"]]
+                      .style
+                      .apply(lambda _: amount_css, subset=["金额"])
+                      .format({"金额": "RM{:.2f}", "日期": _date_str}))
+            st.dataframe(styled, use_container_width=True, hide_index=True)
         else:
             st.info("暂无财务记录")
     
@@ -1766,215 +2276,84 @@ def main():
             # 任务分析
             if not df_tasks.empty:
                 st.write("### 任务分析")
-                fig1, fig2, fig3 = create_task_visualizations(df_tasks)
-                
-                if fig1:
-                    st.plotly_chart(fig1, use_container_width=True)
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if fig2:
-                        st.plotly_chart(fig2, use_container_width=True)
-                
-                with col2:
-                    if fig3:
-                        st.plotly_chart(fig3, use_container_width=True)
-                
+                # 占位符：无已完成任务时不进图表构建，占位内容原地替换
+                task_charts = st.empty()
+                if get_completed_tasks(df_tasks).empty:
+                    task_charts.info("还没有已完成的任务，完成任务后这里会显示图表。")
+                else:
+                    with task_charts.container():
+                        fig1, fig2, fig3 = create_task_visualizations(df_tasks)
+
+                        if fig1:
+                            st.plotly_chart(fig1, use_container_width=True)
+
+                        col1, col2 = st.columns(2)
+
+                        with col1:
+                            if fig2:
+                                st.plotly_chart(fig2, use_container_width=True)
+
+                        with col2:
+                            if fig3:
+                                st.plotly_chart(fig3, use_container_width=True)
+
                 # 任务效率统计
                 st.write("### 任务效率统计")
                 task_stats = calculate_task_efficiency(df_tasks)
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("总任务数", task_stats["total_tasks"])
+                    st.metric("总任务数", task_stats.total_tasks)
                 with col2:
-                    st.metric("完成率", f"{task_stats['completion_rate']*100:.1f}%")
+                    st.metric("完成率", f"{task_stats.completion_rate*100:.1f}%")
                 with col3:
-                    st.metric("总用时", f"{task_stats['total_time']:.1f}分钟")
+                    st.metric("总用时", f"{task_stats.total_time:.1f}分钟")
                 with col4:
-                    st.metric("效率评分", f"{task_stats['efficiency_score']:.2f}")
+                    st.metric("效率评分", f"{task_stats.efficiency_score:.2f}")
             
             st.divider()
             
             # 财务分析
             if not df_finance.empty:
                 st.write("### 财务分析")
-                fig1, fig2, category_table = create_finance_visualizations(df_finance)
-                
-                if fig1:
-                    st.plotly_chart(fig1, use_container_width=True)
-                
-                col1, col2 = st.columns([2, 1])
-                
-                with col1:
-                    if fig2:
-                        st.plotly_chart(fig2, use_container_width=True)
-                
-                with col2:
-                    if category_table is not None:
-                        st.write("**支出分类排名:**")
-                        for idx, row in category_table.head(5).iterrows():
-                            st.write(f"{idx+1}. {row['分类']}: RM{row['金额']:.2f}")
-                
+                finance_charts = st.empty()
+                with finance_charts.container():
+                    fig1, fig2, category_table = create_finance_visualizations(df_finance)
+
+                    if fig1:
+                        st.plotly_chart(fig1, use_container_width=True)
+
+                    col1, col2 = st.columns([2, 1])
+
+                    with col1:
+                        if fig2:
+                            st.plotly_chart(fig2, use_container_width=True)
+
+                    with col2:
+                        if category_table is not None:
+                            st.write("**支出分类排名:**")
+                            top5 = category_table.head(5)
+                            st.markdown("  \n".join(
+                                f"{rank}. {category}: RM{amount:.2f}"
+                                for rank, (category, amount)
+                                in enumerate(zip(top5["分类"], top5["金额"]), 1)))
+
                 # 财务摘要
                 st.write("### 财务摘要")
                 finance_stats = calculate_finance_summary(df_finance)
                 
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.metric("总收入", f"RM{finance_stats['total_income']:.2f}")
+                    st.metric("总收入", f"RM{finance_stats.total_income:.2f}")
                 with col2:
-                    st.metric("总支出", f"RM{finance_stats['total_expense']:.2f}")
+                    st.metric("总支出", f"RM{finance_stats.total_expense:.2f}")
                 with col3:
-                    st.metric("净余额", f"RM{finance_stats['net_balance']:.2f}")
+                    st.metric("净余额", f"RM{finance_stats.net_balance:.2f}")
                 with col4:
-                    st.metric("日均支出", f"RM{finance_stats['avg_daily_expense']:.2f}")
+                    st.metric("日均支出", f"RM{finance_stats.avg_daily_expense:.2f}")
     
     with tab4:
-        # ===== HISTORICAL RECORDS =====
-        st.subheader("历史记录查看")
-        
-        # 日期选择器
-        col1, col2 = st.columns(2)
-        with col1:
-            all_dates = sorted(pd.to_datetime(df_tasks["日期"], errors='coerce').dropna().unique(), reverse=True)
-            date_options = [date.strftime("%Y-%m-%d") for date in all_dates]
-            selected_date = st.selectbox("选择日期", options=date_options, index=0 if date_options else None)
-        
-        with col2:
-            view_mode = st.radio("查看模式", ["任务记录", "财务记录"], horizontal=True)
-        
-        if selected_date:
-            if view_mode == "任务记录":
-                historical_tasks = df_tasks[df_tasks["日期"] == selected_date]
-                
-                if not historical_tasks.empty:
-                    st.write(f"### {selected_date} 的任务记录")
-                    
-                    for idx, row in historical_tasks.iterrows():
-                        status_icon = "✅" if row["完成"] else "⏳"
-                        status_color = "green" if row["完成"] else "orange"
-                        
-                        st.markdown(f"""
-                        <div style="padding: 12px; margin: 8px 0; border-left: 4px solid {status_color}; background: #292828; border-radius: 6px;">
-                            <strong>{status_icon} {row['任务']}</strong><br>
-                            类别: {row['类别']} | 紧急度: {row.get('紧急度', '中')}<br>
-                            状态: {'已完成' if row['完成'] else '未完成'} | 
-                            开始: {row.get('开始时间', '-')} | 
-                            完成: {row.get('完成时间', '-')}<br>
-                            预计: {row.get('预计时间(分)', '-')}分钟 | 
-                            实际: {row.get('实际用时(分)', '-')}分钟 | 
-                            评分: {row.get('评分', '-')}<br>
-                            备注: {row.get('备注', '-')}
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # 生成历史提示词
-                    st.divider()
-                    st.write("### 历史任务提示词")
-                    
-                    def format_historical_task(t):
-                        # 计算效率
-                        try:
-                            actual = float(t.get('实际用时(分)', 0))
-                            estimated = float(t.get('预计时间(分)', 0))
-                            if estimated > 0:
-                                efficiency = round(actual / estimated, 2)
-                            else:
-                                efficiency = 'N/A'
-                        except:
-                            efficiency = 'N/A'
-                        
-                        # 计算用时（优先使用实际用时，否则转换秒数）
-                        try:
-                            if t.get('实际用时(分)'):
-                                duration = f"{t.get('实际用时(分)')}分钟"
-                            else:
-                                seconds = float(t.get('用时(秒)', 0))
-                                duration = f"{round(seconds/60, 1)}分钟"
-                        except:
-                            duration = "0分钟"
-                        
-                        return (
-                            f"日期:{t.get('日期','-')} | "
-                            f"任务:{t.get('任务','-')} | "
-                            f"类别:{t.get('类别','-')} | "
-                            f"完成:{'是' if t.get('完成', False) else '否'} | "
-                            f"用时:{duration} | "
-                            f"评分:{t.get('评分','-')} | "
-                            f"效率:{efficiency}"
-                        )
-                    
-                    historical_prompts = "\n".join([format_historical_task(t) for t in historical_tasks.to_dict('records')])
-                    
-                    st.text_area("历史任务数据", value=historical_prompts, height=200)
-                    
-                    if st.button("复制历史任务数据", use_container_width=True):
-                        st.code(historical_prompts[:500] + "..." if len(historical_prompts) > 500 else historical_prompts)
-                        st.success("已复制到剪贴板!")
-                
-                else:
-                    st.info(f"{selected_date} 没有任务记录")
-            
-            else:  # 财务记录
-                historical_finance = df_finance[df_finance["日期"] == selected_date]
-                
-                if not historical_finance.empty:
-                    st.write(f"### {selected_date} 的财务记录")
-                    
-                    # 计算统计
-                    income = historical_finance[historical_finance["类型"] == "收入"]["金额"].sum()
-                    expense = historical_finance[historical_finance["类型"] == "支出"]["金额"].sum()
-                    
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("当日收入", f"RM{income:.2f}")
-                    with col2:
-                        st.metric("当日支出", f"RM{expense:.2f}")
-                    
-                    # 显示详细记录
-                    for idx, row in historical_finance.iterrows():
-                        amount_color = "green" if row["类型"] == "收入" else "red"
-                        amount_sign = "+" if row["类型"] == "收入" else "-"
-                        
-                        st.markdown(f"""
-                        <div style="padding: 10px; margin: 5px 0; border-left: 3px solid {amount_color}; background: #f9f9f9; border-radius: 5px;">
-                            <strong>{row['创建时间']}</strong><br>
-                            <span style="color: {amount_color}; font-weight: bold;">{amount_sign}RM{row['金额']:.2f}</span> | 
-                            {row['类型']} | {row['分类']} | {row['支付方式']}<br>
-                            <em>{row['备注'] or '无备注'}</em>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # 生成财务提示词
-                    st.divider()
-                    st.write("### 历史财务提示词")
-                    
-                    def format_historical_finance(f):
-                        return (
-                            f"日期:{f.get('日期','-')} | "
-                            f"类型:{f.get('类型','-')} | "
-                            f"金额:RM{f.get('金额',0):.2f} | "
-                            f"分类:{f.get('分类','-')} | "
-                            f"支付方式:{f.get('支付方式','-')} | "
-                            f"备注:{f.get('备注','-')}"
-                        )
-                    
-                    finance_prompts = "\n".join([format_historical_finance(f) for f in historical_finance.to_dict('records')])
-                    
-                    st.text_area("历史财务数据", value=finance_prompts, height=200)
-                    
-                    if st.button("复制历史财务数据", use_container_width=True):
-                        st.code(finance_prompts[:500] + "..." if len(finance_prompts) > 500 else finance_prompts)
-                        st.success("已复制到剪贴板!")
-                
-                else:
-                    st.info(f"{selected_date} 没有财务记录")
-        else:
-            st.info("请选择日期查看历史记录")
-    
-    
+        _history_browser(df_tasks, df_finance)
 
 # ===== RUN APPLICATION =====
 if __name__ == "__main__":